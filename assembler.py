@@ -1,4 +1,16 @@
+import functools
+import glob
+import hashlib
+import json
+import os
+import pickle
+import re
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import objfile
+from collections import namedtuple
 
 optab = ["STOP", "ADD", "SUB", "MULT", "MOVER", "MOVEM", "COMP", "BC", "DIV", "READ", "PRINT"]
 regtab = ["AREG", "BREG", "CREG", "DREG"]
@@ -7,315 +19,1102 @@ dltab = ["DS", "DC"]
 cctab = ["EQ", "LT", "GT", "LE", "GE", "NE"]
 
 
-symbol_table = []
-symbol_count = 0
-literal_table = []
-lit_count = 0
-pool_table = []
-pool_count = 0
-current_pool = {
-    'pool_num': 1,
-    'literals': [],  # List of literals in current pool
-    'start_addr': 0  # Will be set when pool is processed
-}
-
-#--------------Symbol Table----------------------
-
-def search_op(s):
-    return optab.index(s.upper())
-
-def search_reg(s):
-    return regtab.index(s.upper())
-    
-def search_ad(s):
-    return adtab.index(s.upper())
-
-def search_dl(s):
-    return dltab.index(s.upper())
-
-def search_cc(s):
-    return cctab.index(s.upper())
-    
-
-def add_symb(s, a, v, l):
-    global symbol_count
-    symbol_count += 1
-    symbol_table.append({
-        'symb': s,
-        'pos': symbol_count,
-        'addr': a,
-        'val': v,
-        'len': l
-    })
-
-def search_symb(s):
-    for entry in symbol_table:
-        if entry['symb'] == s:
-            return entry
-    return None
-
-def display_symbtab():
-    print("#\tSymbol\tAddress\tValue\tLength")
-    for entry in symbol_table:
-        print(f"{entry['pos']}\t{entry['symb']}\t{entry['addr']}\t{entry['val']}\t{entry['len']}")
-
-#--------------Literal Table----------------------
-
-def add_literal(lit_value):
-    global lit_count
-    # lit_value = int(lit_value.strip("'\""))
-    
-    # Check if literal already exists
-    for entry in literal_table:
-        if entry['value'] == lit_value:
-            return entry['pos']
-    
-    # Add new literal
-    lit_count += 1
-    literal_table.append({
-        'pos': lit_count,
-        'value': lit_value,
-        'address': 0  # Will be filled during second pass
-    })
-    
-
-def search_literal(value):
-    for entry in literal_table:
-        if entry['value'] == value:
-            return entry
-    return None
-
-def display_littab():
-    print("\nLiteral Table:")
-    print("#\tValue\tAddress")
-    for entry in literal_table:
-        print(f"{entry['pos']}) \t{entry['value']}\t{entry['address']}")
-
-
-#------------------Pool table----------------------
-
-def add_to_pool(literal):
-    current_pool['literals'].append(literal)
-
-def create_new_pool():
-    global pool_count, current_pool
-    
-    if current_pool['literals']:  # Only add non-empty pools
-        pool_count += 1
-        pool_table.append({
-            'pool_num': pool_count,
-            'literals': current_pool['literals'],
-            'start_addr': 0  # Will be set during address assignment
-        })
-    
-    # Initialize new current pool
-    current_pool = {
-        'pool_num': pool_count + 1,
-        'literals': [],
-        'start_addr': 0
+# Intermediate-code record, e.g. 201) (IS, 04) (1) (L, 1) is
+# IC(lc=201, cls='IS', code=4, reg=1, operand=('L', 1)). operand is None or
+# a (kind, value) pair with kind 'S' (symbol pos), 'L' (literal pos) or
+# 'C' (constant); reg 0 means no register field.
+IC = namedtuple('IC', ['lc', 'cls', 'code', 'reg', 'operand'])
+
+
+def format_ic(rec):
+    """Serialize an intermediate-code record as one line of text"""
+    text = f"{rec.lc:03d}) ({rec.cls}, {rec.code:02d})"
+    if rec.reg:
+        text += f" ({rec.reg})"
+    if rec.operand is not None:
+        text += f" ({rec.operand[0]}, {rec.operand[1]})"
+    return text
+
+
+def parse_ic(text):
+    """Parse a line written by format_ic back into an IC record"""
+    lc, _, rest = text.partition('\t;')[0].partition(')')
+    fields = [f.strip(' (') for f in rest.split(')')[:-1]]
+    cls, code = fields[0].split(', ')
+    reg = 0
+    operand = None
+    for field in fields[1:]:
+        if ', ' in field:
+            kind, value = field.split(', ')
+            operand = (kind, int(value))
+        else:
+            reg = int(field)
+    return IC(int(lc), cls, int(code), reg, operand)
+
+
+def format_source_ic(lineno, line, rec):
+    """Serialize a record with its source line, for listings
+
+    rec may be None for a line without intermediate code (a comment,
+    blank line or rejected statement); only the annotation is written.
+    """
+    ic_text = format_ic(rec) if rec is not None else ""
+    return f"{ic_text}\t;{lineno}\t{line}"
+
+
+def parse_source_ic(text):
+    """Parse a format_source_ic() line back into (lineno, line, record)"""
+    ic_text, _, source = text.rstrip('\n').partition('\t;')
+    lineno, _, line = source.partition('\t')
+    return int(lineno), line, parse_ic(ic_text) if ic_text else None
+
+
+def read_ic(lines):
+    """Parse intermediate-file lines into IC records, skipping source-only lines"""
+    for line in lines:
+        if not line.startswith('\t;'):
+            yield parse_ic(line)
+
+
+# Mnemonic table: mnemonic -> (class, code, operand shape)
+#   IS shapes: 'none' (STOP), 'reg' (reg, mem), 'cc' (cond, mem), 'mem' (mem)
+#   AD/DL codes are 1-based like their (AD, nn)/(DL, nn) intermediate code
+MNEMONICS = {}
+for _i, _m in enumerate(optab):
+    if _m == "STOP":
+        _shape = 'none'
+    elif _m == "BC":
+        _shape = 'cc'
+    elif _m in ("READ", "PRINT"):
+        _shape = 'mem'
+    else:
+        _shape = 'reg'
+    MNEMONICS[_m] = ('IS', _i, _shape)
+for _i, _m in enumerate(adtab):
+    MNEMONICS[_m] = ('AD', _i + 1, None)
+for _i, _m in enumerate(dltab):
+    MNEMONICS[_m] = ('DL', _i + 1, None)
+
+# Register and condition-code operands -> their (n) field in the IC
+REGISTERS = {r: i + 1 for i, r in enumerate(regtab)}
+CONDITIONS = {c: i + 1 for i, c in enumerate(cctab)}
+
+
+def lookup(table, s):
+    """Look s up in a mnemonic/register table, ignoring case"""
+    entry = table.get(s)
+    if entry is None:
+        entry = table.get(s.upper())
+    return entry
+
+
+class Profiler:
+    """Opt-in per-phase timers and call counters for an Assembler
+
+    attach() replaces the assembler's phase methods on the instance with
+    timed wrappers, so an unprofiled Assembler pays nothing.
+    """
+
+    # phase -> Assembler methods whose time is charged to it
+    PHASES = {
+        'tokenize': ['tokenize'],
+        'lookup': ['classify'],
+        'symbols': ['define_symb', 'ref_symb'],
+        'literals': ['add_literal'],
+        'pools': ['assign_pool_addresses', 'create_new_pool'],
+        'output': ['emit', 'write_ic'],
+        'pass_two': ['pass_two']
     }
 
-def assign_pool_addresses(start_addr):
-    current_addr = start_addr
-    for pool in pool_table:
-        pool['start_addr'] = current_addr
-        for lit in pool['literals']:
-            # Update literal address in literal table
-            lit_entry = search_literal(lit)
-            if lit_entry:
-                lit_entry['address'] = current_addr
+    def __init__(self):
+        self.times = {phase: 0.0 for phase in self.PHASES}
+        self.calls = {}
+        self.assembler = None
+
+    def attach(self, assembler):
+        self.assembler = assembler
+        for phase, methods in self.PHASES.items():
+            for name in methods:
+                setattr(assembler, name, self.wrap(phase, name, getattr(assembler, name)))
+
+    def wrap(self, phase, name, method):
+        times = self.times
+        calls = self.calls
+        calls[name] = 0
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                times[phase] += clock() - start
+                calls[name] += 1
+        return timed
+
+    def time_iter(self, phase, iterable):
+        """Yield from iterable, charging the time spent producing items to phase
+
+        For generators such as stream_pass_two(), whose work happens as
+        they are consumed rather than when they are called.
+        """
+        times = self.times
+        clock = time.perf_counter
+        iterator = iter(iterable)
+        while True:
+            start = clock()
+            item = next(iterator, None)
+            times[phase] += clock() - start
+            if item is None:
+                return
+            yield item
+
+    def report(self):
+        """Return the timings and counters as a JSON-serializable dict"""
+        assembler = self.assembler
+        literals_added = len(assembler.literal_table)
+        return {
+            'times': dict(self.times),
+            'calls': dict(self.calls),
+            'counters': {
+                'lines': assembler.line_count,
+                'symbols_added': len(assembler.symbol_table),
+                'symbol_lookups': self.calls['define_symb'] + self.calls['ref_symb'],
+                'literals_added': literals_added,
+                'literal_dedup_hits': self.calls['add_literal'] - literals_added
+            }
+        }
+
+    def to_json(self):
+        return json.dumps(self.report(), indent=2)
+
+
+# ORIGIN/EQU operand: a number, SYM, SYM+const or SYM-const
+EXPR_RE = re.compile(r"([A-Za-z_]\w*)?([+-]?\d+)?$")
+
+# Operands each IS shape needs
+OPERAND_COUNT = {'none': 0, 'mem': 1, 'reg': 2, 'cc': 2}
+
+
+class Assembler:
+    def __init__(self, out=None, profiler=None, collect_errors=False,
+                 allow_externals=False):
+        # Symbol Table (SYMTAB) - entries in pos order, indexed by name
+        self.symbol_table = []
+        self.symbol_index = {}  # {symbol: entry in symbol_table}
+
+        # Literal Table (LITTAB) - entries in pos order, indexed by value
+        self.literal_table = []
+        self.literal_index = {}  # {literal value: entry}, current pool only
+
+        # Pool Table (POOLTAB)
+        self.pool_table = []
+        self.pool_index = {}  # {start address: entry in pool_table}
+        self.current_pool = {
+            'pool_num': 1,
+            'literals': [],  # LITTAB positions of literals in current pool
+            'start_addr': 0  # Will be set when pool is processed
+        }
+
+        # Intermediate code as IC records; also written as text to out
+        self.out = out  # Any object with a write() method, e.g. an open file
+        self.intermediate_code = []
+        self.pending = []  # Records emitted for the line being processed
+        self.machine_code = []
+        self.origin = 0  # START address
+        self.pc = 0
+        self.end = 0  # Address after the highest word; ORIGIN can move pc back
+        self.line_count = 0
+
+        # EQUs waiting on a forward reference:
+        # {base symbol: [(label, const, EQU line)]}, patched when it is defined
+        self.forward_equs = {}
+
+        # Lines using each symbol in an ORIGIN/EQU expression, for the
+        # listing's cross-reference: {symbol pos: [lines]}
+        self.expression_refs = {}
+
+        # With collect_errors, bad statements are recorded here as
+        # (line, message) and skipped instead of raising ValueError
+        self.collect_errors = collect_errors
+        self.diagnostics = []
+
+        # With allow_externals, symbols used but not defined are taken to be
+        # defined in another module and recorded in warnings instead
+        self.allow_externals = allow_externals
+        self.warnings = []
+
+        # Statement handlers dispatched on the mnemonic's class
+        self.handlers = {
+            'IS': self.handle_is,
+            'AD': self.handle_ad,
+            'DL': self.handle_dl
+        }
+
+        if profiler is not None:
+            profiler.attach(self)
+
+    #--------------Symbol Table----------------------
+
+    def add_symb(self, s, a, v, l, defined=True):
+        entry = {
+            'symb': s,
+            'pos': len(self.symbol_table) + 1,
+            'addr': a,
+            'val': v,
+            'len': l,
+            'defined': defined,  # False until the symbol's definition is seen
+            'absolute': False,  # True for a numeric EQU: never relocated
+            'line': self.line_count if defined else 0  # Defining source line
+        }
+        self.symbol_table.append(entry)
+        self.symbol_index[s] = entry
+        return entry
+
+    def search_symb(self, s):
+        return self.symbol_index.get(s)
+
+    def define_symb(self, s, a, v=0, l=0, absolute=False):
+        """Define a label at address a, adding it if not yet referenced
+
+        An absolute symbol (a numeric EQU) keeps its value when the
+        program is relocated.
+        """
+        p = self.search_symb(s)
+        if p is None:
+            p = self.add_symb(s, a, v, l)
+            p['absolute'] = absolute
+            return p
+        if p['defined']:
+            # Keep the first definition
+            self.error(f"Duplicate symbol {s} (first defined on line {p['line']})")
+            return p
+        p['absolute'] = absolute
+        p['addr'] = a
+        p['val'] = v
+        p['len'] = l
+        p['defined'] = True
+        p['line'] = self.line_count
+        if self.forward_equs and s in self.forward_equs:
+            self.patch_equs(s)
+        return p
+
+    def ref_symb(self, s):
+        """Return the pos of a referenced symbol, adding it if undefined"""
+        p = self.search_symb(s)
+        if p is None:
+            p = self.add_symb(s, 0, 0, 0, defined=False)
+            p['line'] = self.line_count  # First reference, until defined
+        return p['pos']
+
+    def display_symbtab(self):
+        print("#\tSymbol\tAddress\tValue\tLength")
+        for entry in self.symbol_table:
+            print(f"{entry['pos']}\t{entry['symb']}\t{entry['addr']}\t{entry['val']}\t{entry['len']}")
+
+    #--------------Literal Table----------------------
+
+    def add_literal(self, lit_value):
+        # Check if literal already exists in the current pool
+        entry = self.literal_index.get(lit_value)
+        if entry is not None:
+            return entry['pos']
+
+        # Add new literal
+        entry = {
+            'pos': len(self.literal_table) + 1,
+            'value': lit_value,
+            'address': 0  # Will be filled during second pass
+        }
+        self.literal_table.append(entry)
+        self.literal_index[lit_value] = entry
+        self.add_to_pool(entry['pos'])
+        return entry['pos']
+
+    def search_literal(self, value):
+        return self.literal_index.get(value)
+
+    def display_littab(self):
+        print("\nLiteral Table:")
+        print("#\tValue\tAddress")
+        for entry in self.literal_table:
+            print(f"{entry['pos']}) \t{entry['value']}\t{entry['address']}")
+
+    #------------------Pool table----------------------
+
+    def add_to_pool(self, lit_pos):
+        self.current_pool['literals'].append(lit_pos)
+
+    def create_new_pool(self):
+        if self.current_pool['literals']:  # Only add non-empty pools
+            pool = {
+                'pool_num': len(self.pool_table) + 1,
+                'literals': self.current_pool['literals'],
+                'start_addr': self.current_pool['start_addr']
+            }
+            self.pool_table.append(pool)
+            self.pool_index[pool['start_addr']] = pool
+
+        # Initialize new current pool; its literals are not shared with
+        # earlier pools
+        self.current_pool = {
+            'pool_num': len(self.pool_table) + 1,
+            'literals': [],
+            'start_addr': 0
+        }
+        self.literal_index = {}
+
+    def assign_pool_addresses(self, start_addr):
+        """Place the current pool's literals from start_addr (LTORG/END)
+
+        Returns:
+            int: the address following the last literal
+        """
+        self.current_pool['start_addr'] = start_addr
+        current_addr = start_addr
+        for lit_pos in self.current_pool['literals']:
+            self.literal_table[lit_pos - 1]['address'] = current_addr
             current_addr += 1
+        return current_addr
+
+    def display_pooltab(self):
+        print("\nPool Table:")
+        print("Pool\tStart Address\tStart Literal")
+        for pool in self.pool_table:
+            literals_str = ", ".join(self.literal_table[lit_pos - 1]['value']
+                                     for lit_pos in pool['literals'])
+            print(f"{pool['pool_num']}\t{pool['start_addr']}\t\t{literals_str}")
+
+    #------------------Pass I----------------------
+
+    def emit(self, rec):
+        self.pending.append(rec)
+        if self.out is not None:
+            self.out.write(format_ic(rec) + "\n")
+
+    def write_ic(self, out, rec, lineno=None, line=None):
+        """Write one record as text, with its source line when lineno is given"""
+        if lineno is None:
+            out.write(format_ic(rec) + "\n")
+        else:
+            out.write(format_source_ic(lineno, line, rec) + "\n")
+
+    def tokenize(self, line):
+        """Split a source line into tokens in one pass
+
+        Anything after ';' is a comment, and operands may be separated by
+        commas, blanks or both ("AREG, X", "AREG,X"). Built only from str
+        methods that run in C; a regex scanner measured slower.
+        """
+        return line.partition(';')[0].replace(',', ' ').split()
+
+    def classify(self, tokens):
+        """Return (label, mnemonic entry, operands) for a tokenized line
+
+        One lookup decides between "MNEMONIC ..." and "LABEL MNEMONIC ...".
+        """
+        label = None
+        entry = lookup(MNEMONICS, tokens[0])
+        if entry is None and len(tokens) > 1:
+            label = tokens[0]
+            entry = lookup(MNEMONICS, tokens[1])
+            operands = tokens[2:]
+        else:
+            operands = tokens[1:]
+        if entry is None:
+            raise ValueError(f"Unknown mnemonic in line: {' '.join(tokens)}")
+        return label, entry, operands
+
+    #------------------Diagnostics----------------------
+
+    def error(self, message):
+        """Report a recoverable error: raise, or record it and carry on"""
+        if not self.collect_errors:
+            raise ValueError(message)
+        self.diagnostics.append((self.line_count, message))
+
+    def check_undefined(self):
+        """Record a diagnostic for every symbol used but never defined"""
+        for entry in self.symbol_table:
+            if entry['defined']:
+                continue
+            if self.allow_externals:
+                self.warnings.append((entry['line'], f"External symbol {entry['symb']}"))
+            else:
+                self.diagnostics.append((entry['line'], f"Undefined symbol {entry['symb']}"))
+        self.diagnostics.sort(key=lambda d: d[0])
+
+    def display_diagnostics(self, filename, out=sys.stderr):
+        for line, message in self.diagnostics:
+            out.write(f"{filename}:{line}: error: {message}\n")
+
+    #------------------Statements----------------------
+
+    def process_line(self, line):
+        """Translate one source line into intermediate code"""
+        tokens = self.tokenize(line)
+        if not tokens:
+            return
+        label, (cls, code, shape), operands = self.classify(tokens)
+        self.handlers[cls](label, code, shape, operands)
+
+    def handle_is(self, label, code, shape, operands):
+        """Imperative statement: (IS, code) [(reg)] [(S|L, n)]"""
+        pc = self.pc
+        if len(operands) < OPERAND_COUNT[shape]:
+            raise ValueError(f"{optab[code]} needs {OPERAND_COUNT[shape]} operand(s)")
+        if shape == 'reg' or shape == 'cc':
+            table = CONDITIONS if shape == 'cc' else REGISTERS
+            reg = lookup(table, operands[0])
+            if reg is None:
+                kind = "condition" if shape == 'cc' else "register"
+                raise ValueError(f"Unknown {kind}: {operands[0]}")
+        if label:
+            self.define_symb(label, pc)
+
+        if shape == 'none':
+            self.emit(IC(pc, 'IS', code, 0, None))
+        elif shape == 'mem':
+            self.emit(IC(pc, 'IS', code, 0, self.memory_operand(operands[0])))
+        else:
+            self.emit(IC(pc, 'IS', code, reg, self.memory_operand(operands[1])))
+        self.pc = pc + 1
+
+    def handle_dl(self, label, code, shape, operands):
+        """Declarative statement: DS reserves words, DC defines a constant"""
+        pc = self.pc
+        name = dltab[code - 1]
+        if not label or not operands:
+            raise ValueError(f"{name} needs a label and an operand")
+        try:
+            value = int(operands[0].strip("'\""))
+        except ValueError:
+            raise ValueError(f"Bad {name} operand: {operands[0]}") from None
+
+        if code == 1:                                   #DS
+            if value < 1:
+                raise ValueError(f"Bad DS operand: {operands[0]}")
+            self.define_symb(label, pc, 0, value)
+            self.pc = pc + value
+        else:                                           #DC
+            self.define_symb(label, pc, value, 1)
+            self.pc = pc + 1
+        self.emit(IC(pc, 'DL', code, 0, ('C', value)))
+
+    def evaluate(self, operands):
+        """Evaluate an ORIGIN/EQU expression
+
+        Returns:
+            tuple: (value, absolute, None), or (None, None, (symbol, const))
+            when the symbol is not defined yet. absolute is True for a
+            plain number or an expression on an absolute symbol.
+        """
+        text = "".join(operands)                # Allow "SYM + 2"
+        match = EXPR_RE.match(text)
+        if not text or match is None:
+            raise ValueError(f"Bad expression: {text}")
+        name, const = match.groups()
+        const = int(const) if const else 0
+        if name is None:
+            return const, True, None
+        pos = self.ref_symb(name)
+        self.expression_refs.setdefault(pos, []).append(self.line_count)
+        p = self.symbol_table[pos - 1]
+        if not p['defined']:
+            return None, None, (name, const)
+        return p['addr'] + const, p['absolute'], None
+
+    def patch_equs(self, name):
+        """Back-patch EQUs that were waiting for name to be defined
+
+        Entries are updated here rather than through define_symb, so a
+        chain of forward EQUs is patched from the work list without
+        recursing.
+        """
+        work = [name]
+        while work:
+            base = self.symbol_index[work.pop()]
+            for label, const, line in self.forward_equs.pop(base['symb'], []):
+                p = self.symbol_index[label]
+                if p['defined']:
+                    self.error(f"Duplicate symbol {label} (first defined on line {p['line']})")
+                    continue
+                p['addr'] = base['addr'] + const
+                p['absolute'] = base['absolute']
+                p['defined'] = True
+                p['line'] = line
+                if label in self.forward_equs:
+                    work.append(label)
+
+    def handle_ad(self, label, code, shape, operands):
+        """Assembler directive: START/ORIGIN set the location counter"""
+        pc = self.pc
+        if code == 1:                                   #START
+            try:
+                value = int(operands[0]) if operands else 0
+            except ValueError:
+                raise ValueError(f"Bad START operand: {operands[0]}") from None
+            self.emit(IC(pc, 'AD', code, 0, ('C', value)))
+            self.origin = self.pc = value
+            return
+
+        if code == 3:                                   #ORIGIN
+            value, _, forward = self.evaluate(operands)
+            if forward is not None:
+                raise ValueError(f"ORIGIN needs a defined symbol: {forward[0]}")
+            if value < self.origin:
+                raise ValueError(f"ORIGIN {value} is below the START address {self.origin}")
+            self.emit(IC(pc, 'AD', code, 0, ('C', value)))
+            self.pc = value
+            return
+
+        if code == 4:                                   #EQU
+            if not label:
+                raise ValueError("EQU needs a label")
+            value, absolute, forward = self.evaluate(operands)
+            if forward is None:
+                self.define_symb(label, value, absolute=absolute)
+            else:
+                # Leave label undefined until its base symbol is defined
+                self.ref_symb(label)
+                base, const = forward
+                self.forward_equs.setdefault(base, []).append(
+                    (label, const, self.line_count))
+            self.emit(IC(pc, 'AD', code, 0, None))
+            return
+
+        self.emit(IC(pc, 'AD', code, 0, None))
+        # END / LTORG: place the current pool here and start a new one
+        self.pc = self.assign_pool_addresses(pc)
+        self.create_new_pool()
+
+    def memory_operand(self, operand):
+        """Return the (S|L, n) operand for a literal or symbol reference"""
+        if operand.startswith('='):  # Handle literal
+            try:
+                int(operand.lstrip('=').strip("'\""))
+            except ValueError:
+                # Keep the word so later addresses are unchanged
+                self.error(f"Bad literal: {operand}")
+                return ('C', 0)
+            return ('L', self.add_literal(operand))
+        return ('S', self.ref_symb(operand))
+
+    def stream(self, source, with_source=False):
+        """Pass I as a generator: yield IC records line by line
+
+        source is read lazily, so only SYMTAB/LITTAB/POOLTAB are held in
+        memory. Forward references need no back-patching because records
+        refer to symbols by SYMTAB position; pass II resolves them once the
+        addresses are known. With with_source, (lineno, line, record)
+        triples are yielded instead, for write_listing(), including
+        (lineno, line, None) for every line that produced no record.
+        """
+        if isinstance(source, str):
+            source = source.splitlines()
+        pending = self.pending
+        for line in source:
+            self.line_count += 1
+            try:
+                self.process_line(line)
+            except ValueError as e:
+                if not self.collect_errors:
+                    raise
+                self.diagnostics.append((self.line_count, str(e)))
+            if self.pc > self.end:
+                self.end = self.pc
+            if with_source:
+                line = line.rstrip('\n')
+                if not pending:
+                    yield self.line_count, line, None
+                for rec in pending:
+                    yield self.line_count, line, rec
+                pending.clear()
+            elif pending:
+                yield from pending
+                pending.clear()
+        if self.collect_errors:
+            self.check_undefined()
+
+    def pass_one(self, source):
+        """Pass I: build SYMTAB/LITTAB/POOLTAB and the intermediate code"""
+        self.intermediate_code.extend(self.stream(source))
+        return self.intermediate_code
+
+    def assemble(self, source):
+        """Assemble source (a string or iterable of lines) in memory
+
+        Returns:
+            dict: intermediate code and the symbol, literal and pool tables
+        """
+        self.pass_one(source)
+        self.pass_two()
+        return {
+            'intermediate_code': self.intermediate_code,
+            'machine_code': self.machine_code,
+            'symbol_table': self.symbol_table,
+            'literal_table': self.literal_table,
+            'pool_table': self.pool_table,
+            'origin': self.origin,
+            'end': self.end
+        }
+
+    #------------------Pass II----------------------
+
+    def resolve_operand(self, operand, reloc=0, externals=None):
+        """Return the address a (kind, value) operand refers to
+
+        reloc is added to addresses defined in this program. Symbols not
+        defined here are looked up in externals ({name: address}) when
+        given, and resolve to 0 otherwise.
+        """
+        if operand is None:
+            return 0
+        kind, value = operand
+        if kind == 'S':
+            entry = self.symbol_table[value - 1]
+            if entry['defined']:
+                if entry['absolute']:
+                    return entry['addr']
+                return entry['addr'] + reloc
+            if externals is not None:
+                return externals[entry['symb']]
+            return entry['addr']
+        if kind == 'L':
+            return self.literal_table[value - 1]['address'] + reloc
+        return value
+
+    def record_words(self, rec, reloc=0, externals=None):
+        """Return the (lc, opcode, reg, address) words for one IC record"""
+        lc, cls, code, reg, operand = rec
+        if cls == 'IS':
+            return [(lc + reloc, code, reg,
+                     self.resolve_operand(operand, reloc, externals))]
+        if cls == 'DL':
+            if code == 2:                       # DC: constant word
+                return [(lc + reloc, 0, 0, operand[1])]
+            return []
+        pool = self.pool_index.get(lc) if code in (2, 5) else None
+        if pool is None:
+            return []
+
+        # LTORG/END: one constant word per literal in the pool
+        words = []
+        for lit_pos in pool['literals']:
+            entry = self.literal_table[lit_pos - 1]
+            value = int(entry['value'].lstrip('=').strip("'\""))
+            words.append((entry['address'] + reloc, 0, 0, value))
+        return words
+
+    def stream_pass_two(self, records, reloc=0, externals=None):
+        """Pass II as a generator: yield (lc, opcode, reg, address) words
+
+        records may be any iterable of IC records, e.g. parse_ic() over an
+        intermediate file, so the program is never held in memory. reloc
+        and externals are used by the linker, see resolve_operand().
+        """
+        record_words = self.record_words
+        for rec in records:
+            yield from record_words(rec, reloc, externals)
+
+    def pass_two(self, records=None):
+        """Pass II: resolve symbol and literal addresses into target code
+
+        Returns:
+            list: (lc, opcode, reg, address) tuples sorted by address
+        """
+        if records is None:
+            records = self.intermediate_code
+        machine_code = list(self.stream_pass_two(records))
+        machine_code.sort(key=lambda word: word[0])
+        self.machine_code = machine_code
+        return machine_code
+
+    def display_machine_code(self, machine_code=None):
+        if machine_code is None:
+            machine_code = self.machine_code
+        print("\nMachine Code:")
+        for lc, code, reg, addr in machine_code:
+            print(f"{lc:03d}) + {code:02d} {reg} {addr:03d}")
+
+    #------------------Listing----------------------
+
+    def write_listing(self, out, entries):
+        """Write a listing from (lineno, source line, IC record) entries
+
+        entries come from stream(with_source=True) or parse_source_ic(),
+        and are consumed in one pass: each source line is written with its
+        LC, intermediate code and resolved code, with literal pool words
+        after their LTORG/END, and any diagnostics for it underneath. A
+        symbol cross-reference follows.
+        """
+        out.write("Line   LC   Intermediate Code        Code          Source\n")
+        refs = {}  # {symbol pos: [referencing lines]}
+        messages = {}  # {line: [diagnostics]}
+        for lineno, message in self.diagnostics:
+            messages.setdefault(lineno, []).append(message)
+        for lineno, line, rec in entries:
+            if rec is None:
+                # Comment, blank line or a statement rejected with an error
+                out.write(f"{lineno:<7d}{'':44}{line.strip()}".rstrip() + "\n")
+                for message in messages.pop(lineno, []):
+                    out.write(f"{'':7}*** error: {message}\n")
+                continue
+            words = self.record_words(rec)
+            code = ""
+            if words and rec.cls != 'AD':
+                _, opcode, reg, addr = words[0]
+                code = f"+ {opcode:02d} {reg} {addr:03d}"
+            ic = format_ic(rec).partition(') ')[2]
+            out.write(f"{lineno:<7d}{rec.lc:03d}  {ic:<25}{code:<14}{line.strip()}\n")
+            if rec.cls == 'AD':
+                for addr, opcode, reg, value in words:
+                    out.write(f"{'':7}{addr:03d}  {'':25}+ {opcode:02d} {reg} {value:03d}\n")
+            for message in messages.pop(lineno, []):
+                out.write(f"{'':7}*** error: {message}\n")
+            if rec.operand is not None and rec.operand[0] == 'S':
+                refs.setdefault(rec.operand[1], []).append(lineno)
+
+        out.write("\nCross Reference:\n")
+        out.write("Symbol\tAddress\tDefined\tReferenced\n")
+        for entry in self.symbol_table:
+            defined = entry['line'] if entry['defined'] else "-"
+            lines = sorted(refs.get(entry['pos'], []) + self.expression_refs.get(entry['pos'], []))
+            referenced = ", ".join(str(n) for n in lines)
+            out.write(f"{entry['symb']}\t{entry['addr']}\t{defined}\t{referenced}\n")
+
+    def write_object(self, path, machine_code=None):
+        """Write pass II output and the tables as a binary object file"""
+        if machine_code is None:
+            machine_code = self.machine_code
+        end = self.end
+        if machine_code:
+            end = max(end, max(word[0] for word in machine_code) + 1)
+        objfile.write_object(path, self.origin, end - self.origin, machine_code,
+                             self.symbol_table, self.literal_table)
+
+    def print_tables(self):
+        self.display_symbtab()
+        self.display_littab()
+        self.display_pooltab()
+
+
+#------------------Result cache----------------------
+
+# Bump CACHE_FORMAT whenever pass I/II output changes for the same source;
+# TABLE_VERSION changes automatically with the mnemonic tables.
+CACHE_FORMAT = 9
+TABLE_VERSION = hashlib.sha256(
+    repr((CACHE_FORMAT, optab, regtab, adtab, dltab, cctab)).encode()
+).hexdigest()[:16]
+
+
+class AssemblyCache:
+    """On-disk cache of assemble() results keyed by source content hash
+
+    Entries are pickled result dicts in one directory, with IC records
+    stored as plain tuples so entries written by "python assembler.py"
+    (where IC lives in __main__) load anywhere. A hit refreshes
+    the entry's mtime, and evict() removes the least recently used
+    entries until the directory fits in max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, data, variant=b""):
+        return hashlib.sha256(TABLE_VERSION.encode() + variant + b"\0" + data).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def get(self, data, variant=b""):
+        path = self.path(self.key(data, variant))
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+            result['intermediate_code'] = [IC._make(rec) for rec in result['intermediate_code']]
+            os.utime(path)  # Mark as recently used
+        except Exception:
+            return None  # Any unreadable entry is a miss
+        return result
+
+    def put(self, data, result, variant=b""):
+        path = self.path(self.key(data, variant))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        result = dict(result, intermediate_code=[tuple(rec) for rec in result['intermediate_code']])
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # Atomic, so workers never see a partial entry
+
+    def evict(self):
+        """Remove least recently used entries until under max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pkl"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+#------------------Batch assembly----------------------
+
+def assemble_file(path, cache_dir=None, allow_externals=False):
+    """Assemble one source file, returning its results and any error
+
+    Used as the process-pool worker, so it must stay a module-level
+    function and only return picklable data. With cache_dir, unchanged
+    sources are served from an AssemblyCache instead of re-assembled.
+    With allow_externals, undefined symbols are warnings, not errors.
+    """
+    start = time.perf_counter()
+    assembler = Assembler(collect_errors=True, allow_externals=allow_externals)
+    result = {'file': path, 'errors': [], 'warnings': [], 'cached': False}
+    cache = None
+    try:
+        if cache_dir is None:
+            with open(path, 'r') as sf:
+                result.update(assembler.assemble(sf))
+        else:
+            cache = AssemblyCache(cache_dir)
+            with open(path, 'rb') as sf:
+                data = sf.read()
+            # Results differ with allow_externals, so key them separately
+            variant = b"externals" if allow_externals else b""
+            cached = cache.get(data, variant)
+            if cached is not None:
+                result.update(cached)
+                result['cached'] = True
+            else:
+                result.update(assembler.assemble(data.decode().splitlines()))
+    except Exception as e:
+        # Report anything unexpected as this file's error, so one bad
+        # file cannot abort the whole batch
+        result['errors'].append(f"line {assembler.line_count}: {e}")
+
+    if not result['cached']:
+        result['lines'] = assembler.line_count
+        result['warnings'] = [f"line {line}: {message}"
+                              for line, message in assembler.warnings]
+        result['errors'].extend(f"line {line}: {message}"
+                                for line, message in assembler.diagnostics)
+        if cache is not None and not result['errors']:
+            try:
+                cache.put(data, {k: v for k, v in result.items()
+                                 if k not in ('file', 'errors', 'cached')}, variant)
+            except OSError:
+                pass  # Not cached; the file is simply assembled again next time
+    result['time'] = time.perf_counter() - start
+    return result
+
+
+def expand_sources(args):
+    """Expand files, directories (all *.asm inside) and glob patterns"""
+    paths = []
+    for arg in args:
+        if os.path.isdir(arg):
+            paths.extend(sorted(glob.glob(os.path.join(arg, '*.asm'))))
+        elif glob.has_magic(arg):
+            paths.extend(sorted(glob.glob(arg)))
+        else:
+            paths.append(arg)
+    return paths
+
+
+def intermediate_name(path):
+    """Name of a source file's intermediate code file in a batch -o DIR"""
+    return os.path.splitext(os.path.basename(path))[0] + ".i"
+
+
+def assemble_batch(paths, workers=None, cache=None, allow_externals=False):
+    """Assemble many independent files concurrently across CPU cores
+
+    Returns:
+        list: one assemble_file() result per path, in input order
+    """
+    worker = functools.partial(assemble_file, allow_externals=allow_externals)
+    if cache is not None:
+        worker = functools.partial(worker, cache_dir=cache.cache_dir)
+    chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(worker, paths, chunksize=chunksize))
+    if cache is not None:
+        cache.evict()
+    return results
+
+
+def batch_main(args):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python assembler.py --batch",
+        description="Assemble many source files in parallel")
+    parser.add_argument('sources', nargs='+',
+                        help="source files, directories or glob patterns")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument('-o', '--out-dir',
+                        help="write each file's intermediate code to <out-dir>/<name>.i")
+    parser.add_argument('--externals', action='store_true',
+                        help="allow symbols defined in other modules (reported as warnings)")
+    parser.add_argument('--cache', metavar='DIR',
+                        help="reuse results for unchanged sources from DIR")
+    parser.add_argument('--cache-size', type=int, default=256, metavar='MB',
+                        help="evict least recently used entries above this size")
+    opts = parser.parse_args(args)
+
+    cache = None
+    if opts.cache:
+        cache = AssemblyCache(opts.cache, opts.cache_size * 1024 * 1024)
+
+    paths = expand_sources(opts.sources)
+    if opts.out_dir:
+        # Refuse inputs from different directories that would overwrite
+        # each other's <name>.i before doing any work
+        seen = {}
+        for path in paths:
+            name = intermediate_name(path)
+            if name in seen and os.path.abspath(seen[name]) != os.path.abspath(path):
+                parser.error(f"{seen[name]} and {path} would both write "
+                             f"{os.path.join(opts.out_dir, name)}")
+            seen[name] = path
+        os.makedirs(opts.out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    results = assemble_batch(paths, opts.jobs, cache, opts.externals)
+    elapsed = time.perf_counter() - start
+
+    total_lines = 0
+    failed = 0
+    hits = 0
+    for result in results:
+        total_lines += result['lines']
+        hits += result['cached']
+        for warning in result['warnings']:
+            sys.stderr.write(f"{result['file']}: warning: {warning}\n")
+        if result['errors']:
+            failed += 1
+            for error in result['errors']:
+                sys.stderr.write(f"{result['file']}: error: {error}\n")
+            continue
+        print(f"{result['file']}: {result['lines']} lines, "
+              f"{len(result['symbol_table'])} symbols, "
+              f"{len(result['literal_table'])} literals")
+        if opts.out_dir:
+            with open(os.path.join(opts.out_dir, intermediate_name(result['file'])), 'w') as tf:
+                for rec in result['intermediate_code']:
+                    tf.write(format_ic(rec) + "\n")
+
+    rate = total_lines / elapsed if elapsed else 0.0
+    print(f"\n{len(results)} files ({failed} failed, {hits} cached), {total_lines} lines "
+          f"in {elapsed:.3f}s ({rate:.0f} lines/sec)")
+    if failed:
+        sys.exit(1)
 
-def display_pooltab():
-    print("\nPool Table:")
-    print("Pool\tStart Address\tStart Literal")
-    for pool in pool_table:
-        # start_literal = pool['literals'][0]
-        # print(f"{pool['pool_num']}\t{pool['start_addr']}\t\t{start_literal}")
-        literals_str = ", ".join(str(lit) for lit in pool['literals'])
-        print(f"{pool['pool_num']}\t{pool['start_addr']}\t\t{literals_str}")
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        batch_main(sys.argv[2:])
+        return
+
     if len(sys.argv) < 2:
-        print("Usage: python assembler.py <source_file>")
+        print("Usage: python assembler.py <source_file> [intermediate_file]"
+              " [--keep-going] [--object out.o] [--listing out.lst] [--profile out.json]")
+        print("       python assembler.py --batch [-j N] [-o DIR] [--externals] [--cache DIR]"
+              " <file|dir|glob>...")
+        sys.exit(1)
+
+    args = sys.argv[1:]
+    profiler = None
+    profile_filename = None
+    if "--profile" in args:
+        i = args.index("--profile")
+        profile_filename = args[i + 1]
+        del args[i:i + 2]
+        profiler = Profiler()
+    object_filename = None
+    if "--object" in args:
+        i = args.index("--object")
+        object_filename = args[i + 1]
+        del args[i:i + 2]
+    collect_errors = "--keep-going" in args
+    if collect_errors:
+        args.remove("--keep-going")
+    listing_filename = None
+    if "--listing" in args:
+        i = args.index("--listing")
+        listing_filename = args[i + 1]
+        del args[i:i + 2]
+
+    source_filename = args[0]
+    temp_filename = args[1] if len(args) > 1 else None
+
+    if temp_filename is None:
+        # Stream intermediate code straight to stdout
+        assembler = Assembler(out=sys.stdout, profiler=profiler,
+                              collect_errors=collect_errors)
+        with open(source_filename, 'r') as sf:
+            if listing_filename is None:
+                assembler.pass_one(sf)
+            else:
+                entries = list(assembler.stream(sf, with_source=True))
+                assembler.intermediate_code.extend(
+                    rec for _, _, rec in entries if rec is not None)
+        assembler.print_tables()
+        assembler.pass_two()
+        assembler.display_machine_code()
+        if object_filename is not None:
+            assembler.write_object(object_filename)
+        if listing_filename is not None:
+            with open(listing_filename, 'w') as lf:
+                assembler.write_listing(lf, entries)
+    else:
+        # Streaming mode: pass I writes the intermediate file as it reads the
+        # source, pass II reads it back, so memory is bounded by the tables.
+        # For a listing the file also carries each record's source line.
+        with open(source_filename, 'r') as sf, open(temp_filename, 'w') as tf:
+            assembler = Assembler(profiler=profiler, collect_errors=collect_errors)
+            for lineno, line, rec in assembler.stream(sf, with_source=True):
+                if listing_filename is not None:
+                    assembler.write_ic(tf, rec, lineno, line)
+                elif rec is not None:
+                    assembler.write_ic(tf, rec)
+                if rec is not None:
+                    assembler.write_ic(sys.stdout, rec)
+
+        assembler.print_tables()
+        with open(temp_filename, 'r') as tf:
+            machine_code = assembler.stream_pass_two(read_ic(tf))
+            if profiler is not None:
+                machine_code = profiler.time_iter('pass_two', machine_code)
+            if object_filename is not None:
+                # The object image needs every word, so collect them
+                machine_code = list(machine_code)
+                assembler.write_object(object_filename, machine_code)
+            assembler.display_machine_code(machine_code)
+        if listing_filename is not None:
+            with open(temp_filename, 'r') as tf, open(listing_filename, 'w') as lf:
+                assembler.write_listing(lf, (parse_source_ic(line) for line in tf))
+
+    if profiler is not None:
+        with open(profile_filename, 'w') as pf:
+            pf.write(profiler.to_json() + "\n")
+
+    if assembler.diagnostics:
+        assembler.display_diagnostics(source_filename)
         sys.exit(1)
-    
-    source_filename = sys.argv[1]
-    temp_filename = "temp.i"
-    pc = 0
-
-    with open(source_filename, 'r') as sf, open(temp_filename, 'w') as tf:
-        for line in sf:
-            line = line.strip()
-            if not line:
-                continue
-            tokens = line.split()
-            n = len(tokens)
-            t1 = t2 = t3 = t4 = ''
-            if n >= 1:
-                t1 = tokens[0]
-            if n >= 2:
-                t2 = tokens[1]
-            if n >= 3:
-                t3 = tokens[2]
-            if n >= 4:
-                t4 = tokens[3]
-
-            #Case: 1 token
-            if n == 1:
-                if t1 in optab:
-                    if (op_idx := search_op(t1)) == 0:        #STOP
-                        tf.write(f"{pc:03d}) (IS, {op_idx:02d})\n")
-                elif t1 in adtab:
-                    if (ad_idx := search_ad(t1)) == 0:          #START
-                        tf.write(f"{pc:03d}) (AD, {ad_idx + 1:02d}) (C, 0)\n")
-                    elif ad_idx != -1:                          #Not END
-                            tf.write(f"{pc:03d}) (AD, {ad_idx + 1:02d})\n")
-
-            #Case: 2 tokens
-            elif n == 2:
-                if t1 in optab:
-                    op_idx = search_op(t1)
-                    if op_idx in [9, 10]:
-                        s = t2
-                        p = search_symb(s)
-                        if p is None:
-                            add_symb(s, 0, 0, 0)
-                            sym_pos = symbol_count
-                        else:
-                            sym_pos = p['pos']
-                        tf.write(f"{pc:03d}) (IS, {op_idx:02d}) (S, {sym_pos})\n")
-                    else:
-                        s = t1
-                        p = search_symb(s)
-                        if p is None:
-                            add_symb(s, pc, 0, 0)
-                        else:
-                            p['addr'] = pc
-                        tf.write(f"{pc:03d}) (IS, 00)\n")
-                else:
-                    ad_idx = search_ad(t1)
-                    if ad_idx != -1:
-                        if ad_idx == 0:
-                            new_pc = int(t2) - 1
-                            tf.write(f"{pc:03d}) (AD, {ad_idx + 1:02d}) (C, {t2})\n")
-                            pc = new_pc
-                        else:
-                            tf.write(f"{pc:03d}) (AD, {ad_idx + 1:02d})\n")
-
-            #Case: 3 tokens
-            elif n == 3:
-                if t2 in dltab:                     #If DL statement
-                    dl_idx = search_dl(t2)
-                    if dl_idx == 0:
-                        s = t1
-                        value = int(t3)
-                        p = search_symb(s)
-                        if p is None:
-                            add_symb(s, pc, 0, value)
-                        else:
-                            p['addr'] = pc
-                            p['val'] = 0
-                            p['len'] = value
-                        tf.write(f"{pc:03d}) (DL, {dl_idx + 1:02d}) (C, {t3})\n")
-                        pc += value - 1
-                    elif dl_idx == 1:
-                        s = t1
-                        value = int(t3.strip("'\""))
-                        p = search_symb(s)
-                        if p is None:
-                            add_symb(s, pc, value, 1)
-                        else:
-                            p['addr'] = pc
-                            p['val'] = value
-                            p['len'] = 1
-                        tf.write(f"{pc:03d}) (DL, {dl_idx + 1:02d}) (C, {value})\n")
-                
-                else:                               
-                    if t1 in optab:                 #If IS statement
-                        op_idx = search_op(t1)
-                        if 1 <= op_idx <= 8:
-                            reg_part = t2.rstrip(',')
-
-                            if op_idx == 7:
-                                cc_idx = search_cc(reg_part)
-                                reg_idx = cc_idx + 1
-                            else:
-                                reg_idx = search_reg(reg_part)
-
-                            if t3.startswith('='):  # Handle literal
-                                lit_value = t3
-                                lit_pos = add_literal(lit_value)
-                                add_to_pool(lit_value)  # Add to current pool
-                                tf.write(f"{pc:03d}) (IS, {op_idx:02d}) ({reg_idx + 1}) (L, {lit_pos})\n")
-                            else:
-                                s = t3
-                                p = search_symb(s)
-                                if p is None:
-                                    add_symb(s, 0, 0, 0)
-                                    sym_pos = symbol_count
-                                else:
-                                    sym_pos = p['pos']
-                            tf.write(f"{pc:03d}) (IS, {op_idx:02d}) ({reg_idx + 1}) (S, {sym_pos})\n")
-                        else:
-                            op_idx = search_op(t2)
-                            s = t1
-                            p = search_symb(s)
-                            if p is None:
-                                add_symb(s, pc, 0, 0)
-                            else:
-                                p['addr'] = pc
-                            s = t3
-                            p = search_symb(s)
-                            if p is None:
-                                add_symb(s, 0, 0, 0)
-                                sym_pos = symbol_count
-                            else:
-                                sym_pos = p['pos']
-                            tf.write(f"{pc:03d}) (IS, {op_idx:02d}) (S, {sym_pos})\n")
-
-            elif n >= 4:
-                op_idx = search_op(t2)
-                reg_part = t3.rstrip(',')
-                reg_idx = search_reg(reg_part)
-                s = t1
-                p = search_symb(s)
-                if p is None:
-                    add_symb(s, pc, 0, 0)
-                else:
-                    p['addr'] = pc
-                
-                if t4.startswith('='):  # Handle literal
-                    lit_value = t4
-                    lit_pos = add_literal(lit_value)
-                    add_to_pool(lit_value)  # Add to current pool
-                    tf.write(f"{pc:03d}) (IS, {op_idx:02d}) ({reg_idx + 1}) (L, {lit_pos})\n")
-                else:
-                    s = t4
-                    p = search_symb(s)
-                    if p is None:
-                        add_symb(s, 0, 0, 0)
-                        sym_pos = symbol_count
-                    else:
-                        sym_pos = p['pos']
-                tf.write(f"{pc:03d}) (IS, {op_idx:02d}) ({reg_idx + 1}) (S, {sym_pos})\n")
-            pc += 1
-
-            # Add pool handling after processing each line
-            if t1 == "LTORG" or t1 == "END":
-                # Process current pool
-                assign_pool_addresses(pc)
-                if t1 == "LTORG":
-                    create_new_pool()  # Start new pool after LTORG
-                elif t1 == "END":
-                    create_new_pool()  # Final pool
-
-    with open(temp_filename, 'r') as tf:
-        print(tf.read(), end='')
-
-    display_symbtab()
-    display_littab()
-    display_pooltab()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
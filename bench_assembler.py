@@ -0,0 +1,169 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+from assembler import Assembler, cctab, regtab
+
+REG_OPS = ["MOVER", "MOVEM", "ADD", "SUB", "MULT", "COMP", "DIV"]
+
+
+def generate_program(statements, symbols=100, literal_density=0.2,
+                     ltorg_every=50, forward_ratio=0.5, seed=0):
+    """Generate a synthetic program in the same dialect as asm1.asm
+
+    Args:
+        statements (int): number of imperative statements
+        symbols (int): distinct symbols, split between data (DS) and labels
+        literal_density (float): fraction of memory operands that are literals
+        ltorg_every (int): emit LTORG after this many statements (0 = never)
+        forward_ratio (float): fraction of symbol operands referring to a
+            symbol defined later in the program
+        seed (int): random seed, so runs are reproducible
+
+    Returns:
+        list: source lines
+    """
+    rng = random.Random(seed)
+    n_data = max(1, symbols // 2)
+    n_labels = max(1, symbols - n_data)
+    label_every = max(1, statements // n_labels)
+    data = [f"D{i}" for i in range(n_data)]
+
+    lines = ["    START 100"]
+    defined = []            # Labels already defined (backward references)
+    for i in range(statements):
+        label = ""
+        if i % label_every == 0 and len(defined) < n_labels:
+            label = f"L{len(defined)}"
+
+        if rng.random() < forward_ratio or not defined:
+            symbol = rng.choice(data)          # DS symbols follow the code
+        else:
+            symbol = rng.choice(defined)
+
+        kind = rng.random()
+        if kind < 0.1:
+            stmt = f"{rng.choice(['READ', 'PRINT'])} {symbol}"
+        elif kind < 0.2:
+            stmt = f"BC {rng.choice(cctab)}, {symbol}"
+        else:
+            if rng.random() < literal_density:
+                operand = f"='{rng.randint(1, 99)}'"
+            else:
+                operand = symbol
+            stmt = f"{rng.choice(REG_OPS)} {rng.choice(regtab)}, {operand}"
+        lines.append(f"{label} {stmt}" if label else f"    {stmt}")
+        if label:
+            defined.append(label)
+
+        if ltorg_every and (i + 1) % ltorg_every == 0:
+            lines.append("    LTORG")
+
+    lines.append("    STOP")
+    for symbol in data:
+        lines.append(f"{symbol} DS 1")
+    lines.append("    END")
+    return lines
+
+
+def run_once(lines):
+    """Assemble lines once, returning per-phase times in seconds"""
+    assembler = Assembler()
+    start = time.perf_counter()
+    assembler.pass_one(lines)
+    mid = time.perf_counter()
+    assembler.pass_two()
+    end = time.perf_counter()
+    return {'pass_one': mid - start, 'pass_two': end - mid, 'total': end - start}
+
+
+def peak_memory(lines):
+    """Peak memory in bytes allocated while running pass I"""
+    tracemalloc.start()
+    Assembler().pass_one(lines)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def benchmark(lines, repeat=5):
+    """Best-of-repeat timings for each phase, plus peak pass I memory"""
+    best = None
+    for _ in range(repeat):
+        times = run_once(lines)
+        if best is None or times['total'] < best['total']:
+            best = times
+    best['peak_bytes'] = peak_memory(lines)
+    best['lines'] = len(lines)
+    best['lines_per_sec'] = len(lines) / best['pass_one'] if best['pass_one'] else 0.0
+    return best
+
+
+def split_tokenize(line):
+    """The original pass I tokenizing: split, then strip operand commas"""
+    return [t.rstrip(',') for t in line.strip().split()]
+
+
+def bench_tokenizer(lines, repeat=5):
+    """Best-of-repeat seconds for split_tokenize and Assembler.tokenize"""
+    tokenize = Assembler().tokenize
+    results = {}
+    for name, func in (('split', split_tokenize), ('tokenize', tokenize)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for line in lines:
+                func(line)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        results[name] = best
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark assembler pass I/II")
+    parser.add_argument('-n', '--statements', type=int, nargs='+',
+                        default=[1000, 10000, 100000],
+                        help="program sizes to benchmark")
+    parser.add_argument('-s', '--symbols', type=int, default=1000)
+    parser.add_argument('-l', '--literal-density', type=float, default=0.2)
+    parser.add_argument('--ltorg-every', type=int, default=50)
+    parser.add_argument('-f', '--forward-ratio', type=float, default=0.5)
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-w', '--write', metavar='FILE',
+                        help="also write the largest generated program to FILE")
+    parser.add_argument('-t', '--tokenizer', action='store_true',
+                        help="compare the tokenizer against the split path instead")
+    opts = parser.parse_args()
+
+    if opts.tokenizer:
+        print("Lines".ljust(10) + "split (s)".ljust(12) + "tokenize (s)".ljust(14) + "Speedup")
+        for statements in opts.statements:
+            lines = generate_program(statements, opts.symbols, opts.literal_density,
+                                     opts.ltorg_every, opts.forward_ratio, opts.seed)
+            result = bench_tokenizer(lines, opts.repeat)
+            speedup = result['split'] / result['tokenize'] if result['tokenize'] else 0.0
+            print(f"{str(len(lines)).ljust(10)}{result['split']:<12.4f}"
+                  f"{result['tokenize']:<14.4f}{speedup:.2f}x")
+        return
+
+    print("Lines".ljust(10) + "Pass I (s)".ljust(12) + "Pass II (s)".ljust(13)
+          + "Lines/sec".ljust(12) + "Peak KiB")
+    for statements in opts.statements:
+        lines = generate_program(statements, opts.symbols, opts.literal_density,
+                                 opts.ltorg_every, opts.forward_ratio, opts.seed)
+        result = benchmark(lines, opts.repeat)
+        print(f"{str(result['lines']).ljust(10)}"
+              f"{result['pass_one']:<12.4f}{result['pass_two']:<13.4f}"
+              f"{result['lines_per_sec']:<12.0f}{result['peak_bytes'] // 1024}")
+
+    if opts.write:
+        with open(opts.write, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    main()
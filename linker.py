@@ -0,0 +1,155 @@
+import sys
+
+import objfile
+from assembler import Assembler
+
+
+class Linker:
+    def __init__(self, origin=None):
+        # Link origin; defaults to the START address of the first module
+        self.origin = origin
+
+        # Modules in load order: {'name', 'assembler', 'load_addr', 'reloc', 'size'}
+        self.modules = []
+
+        # Global symbol table - {symbol: {'addr': absolute address, 'module': name}}
+        self.global_symbols = {}
+
+        self.machine_code = []
+        self.end = 0
+
+    def add_module(self, name, assembler):
+        """Add a module that has already been through pass I"""
+        self.modules.append({
+            'name': name,
+            'assembler': assembler,
+            'load_addr': 0,
+            'reloc': 0,
+            'size': assembler.end - assembler.origin
+        })
+
+    def relocate(self):
+        """Assign each module a load address, one after another"""
+        addr = self.origin
+        if addr is None:
+            addr = self.modules[0]['assembler'].origin if self.modules else 0
+        for module in self.modules:
+            module['load_addr'] = addr
+            module['reloc'] = addr - module['assembler'].origin
+            addr += module['size']
+        self.end = addr
+
+    def build_symbol_index(self):
+        """Collect every module's defined symbols into the global table"""
+        errors = []
+        self.global_symbols = {}
+        for module in self.modules:
+            for entry in module['assembler'].symbol_table:
+                if not entry['defined']:
+                    continue
+                name = entry['symb']
+                if name in self.global_symbols:
+                    errors.append(f"Duplicate symbol {name} in {module['name']} "
+                                  f"(first defined in {self.global_symbols[name]['module']})")
+                    continue
+                # Absolute symbols (numeric EQUs) are not relocated
+                reloc = 0 if entry['absolute'] else module['reloc']
+                self.global_symbols[name] = {
+                    'addr': entry['addr'] + reloc,
+                    'module': module['name']
+                }
+
+        # Every symbol a module uses but does not define must be global
+        for module in self.modules:
+            for entry in module['assembler'].symbol_table:
+                if not entry['defined'] and entry['symb'] not in self.global_symbols:
+                    errors.append(f"Undefined symbol {entry['symb']} in {module['name']}")
+        return errors
+
+    def link(self):
+        """Relocate all modules and resolve cross-module references
+
+        Returns:
+            list: (address, opcode, reg, address) words sorted by address
+
+        Raises:
+            ValueError: listing every duplicate or undefined symbol
+        """
+        self.relocate()
+        errors = self.build_symbol_index()
+        if errors:
+            raise ValueError("\n".join(errors))
+
+        externals = {name: sym['addr'] for name, sym in self.global_symbols.items()}
+        machine_code = []
+        for module in self.modules:
+            assembler = module['assembler']
+            machine_code.extend(assembler.stream_pass_two(
+                assembler.intermediate_code, module['reloc'], externals))
+        machine_code.sort(key=lambda word: word[0])
+        self.machine_code = machine_code
+        return machine_code
+
+    def write_object(self, path):
+        """Write the linked program as a single object file"""
+        symbol_table = [
+            {'symb': name, 'addr': sym['addr'], 'val': 0, 'len': 0}
+            for name, sym in self.global_symbols.items()
+        ]
+        literal_table = []
+        for module in self.modules:
+            for entry in module['assembler'].literal_table:
+                literal_table.append(dict(entry, address=entry['address'] + module['reloc']))
+        objfile.write_object(path, self.modules[0]['load_addr'],
+                             self.end - self.modules[0]['load_addr'],
+                             self.machine_code, symbol_table, literal_table)
+
+    def display_link_map(self):
+        print("Link Map:")
+        print("Module".ljust(20) + "Load Address".ljust(15) + "Size")
+        for module in self.modules:
+            print(f"{module['name'].ljust(20)}{str(module['load_addr']).ljust(15)}{module['size']}")
+
+        print("\nGlobal Symbol Table:")
+        print("Symbol\tAddress\tModule")
+        for name, sym in self.global_symbols.items():
+            print(f"{name}\t{sym['addr']}\t{sym['module']}")
+
+    def display_machine_code(self):
+        print("\nLinked Machine Code:")
+        for lc, code, reg, addr in self.machine_code:
+            print(f"{lc:03d}) + {code:02d} {reg} {addr:03d}")
+
+
+def main():
+    args = sys.argv[1:]
+    object_filename = None
+    if "--object" in args:
+        i = args.index("--object")
+        object_filename = args[i + 1]
+        del args[i:i + 2]
+
+    if not args:
+        print("Usage: python linker.py <source_file>... [--object out.o]")
+        sys.exit(1)
+
+    linker = Linker()
+    for source_filename in args:
+        assembler = Assembler()
+        with open(source_filename, 'r') as sf:
+            assembler.pass_one(sf)
+        linker.add_module(source_filename, assembler)
+
+    try:
+        linker.link()
+    except ValueError as e:
+        print(f"Link failed:\n{e}")
+        sys.exit(1)
+
+    linker.display_link_map()
+    linker.display_machine_code()
+    if object_filename is not None:
+        linker.write_object(object_filename)
+
+if __name__ == "__main__":
+    main()
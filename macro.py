@@ -1,86 +1,214 @@
+import hashlib
+import os
+import pickle
+import re
+import sys
+
+# Bump LIBRARY_FORMAT whenever the MNT/MDT layout or template syntax changes,
+# so stale library files are rebuilt instead of loaded
+LIBRARY_FORMAT = 2
+
+# Whole tokens in a macro body line, so formal P5 never matches inside P55;
+# an optional '&' prefix covers the usual &A style of formal
+TOKEN_RE = re.compile(r'&?\w+')
+
+
+def compile_template(line, formal_params):
+    """Compile a macro body line into a str.format template
+
+    Literal text is kept (with braces escaped) and each whole-token
+    occurrence of a formal parameter becomes a positional slot, e.g.
+    "    STORE P4" with formals [P4, P5] becomes "    STORE {0}".
+    """
+    slots = {name: i for i, name in enumerate(formal_params)}
+    parts = []
+    pos = 0
+    for match in TOKEN_RE.finditer(line):
+        slot = slots.get(match.group())
+        if slot is not None:
+            parts.append(line[pos:match.start()].replace('{', '{{').replace('}', '}}'))
+            parts.append(f"{{{slot}}}")
+            pos = match.end()
+    parts.append(line[pos:].replace('{', '{{').replace('}', '}}'))
+    return ''.join(parts)
+
+
 class MacroProcessor:
-    def __init__(self):
-        # Macro Name Table (MNT) - stores macro names and their positions in MDT
-        self.macro_name_table = {}  # {macro_name: mdt_index}
+    def __init__(self, max_depth=64):
+        # Macro Name Table (MNT) - each macro's body span in the MDT and formals
+        self.macro_name_table = {}  # {macro_name: (start, end, formal_params)}
         
-        # Macro Definition Table (MDT) - stores macro definitions
-        self.macro_def_table = []  # List of macro definitions
+        # Macro Definition Table (MDT) - every macro body line, flat and
+        # interned, precompiled so parameters are positional slots {0}, {1}...
+        self.macro_def_table = []
         
-        # Argument List Array (ALA) - stores formal and actual parameters
-        self.ala = {}  # {macro_name: {'formal': [...], 'actual': [...]}}
+        # The Argument List Array (ALA) is the tuple of actuals built for
+        # each call in expand_macro, so expansion shares no mutable state
+        
+        # Nested expansion limit and fully expanded parameterless macros
+        self.max_depth = max_depth
+        self.expansion_cache = {}  # {macro_name: [expanded lines]}
         
         self.intermediate_code = []
 
+    def define_macro(self, header, body):
+        """Add a macro to the MNT and MDT
+
+        header is the MACRO line and body the lines up to (not including) MEND.
+        """
+        # Extract macro name and parameters
+        parts = header.split()
+        macro_name = parts[1]
+        if len(parts) > 2:
+            # Get parameters and remove trailing commas
+            formal_params = [p.rstrip(',') for p in parts[2:]]
+        else:
+            formal_params = ['-']
+        
+        # Add body to MDT and its span (plus formals, which fix the ALA slots) to MNT
+        start = len(self.macro_def_table)
+        self.macro_def_table.extend(
+            sys.intern(compile_template(line, formal_params)) for line in body)
+        self.macro_name_table[macro_name] = (start, len(self.macro_def_table),
+                                             tuple(formal_params))
+        
+        # A cached expansion may use an older definition, or have passed a
+        # call to a then-undefined macro through unchanged
+        self.expansion_cache.clear()
+
+    def save_library(self, path):
+        """Write the MNT and precompiled MDT to a library file"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((LIBRARY_FORMAT, self.macro_name_table, self.macro_def_table),
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # Atomic, so readers never see a partial file
+
+    def load_library(self, path):
+        """Add the macros in a library file written by save_library
+
+        Returns:
+            bool: False if the file is missing, unreadable or another format
+        """
+        try:
+            with open(path, 'rb') as f:
+                version, mnt, mdt = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            return False
+        if version != LIBRARY_FORMAT:
+            return False
+        
+        # Shift the library's spans past any macros already defined
+        offset = len(self.macro_def_table)
+        self.macro_def_table.extend(sys.intern(line) for line in mdt)
+        for name, (start, end, formal_params) in mnt.items():
+            self.macro_name_table[name] = (start + offset, end + offset, formal_params)
+        self.expansion_cache.clear()
+        return True
+
+    def load_cached_library(self, source_code, cache_dir):
+        """Add the macros defined in source_code, via an on-disk cache
+
+        The library file is keyed by a hash of the source, so an
+        unchanged library costs one file read; otherwise it is parsed
+        with first_pass and saved for next time.
+
+        Returns:
+            bool: True if the macros were loaded from the cache
+        """
+        key = hashlib.sha256(f"{LIBRARY_FORMAT}\n{source_code}".encode()).hexdigest()
+        path = os.path.join(cache_dir, key + ".mlib")
+        if self.load_library(path):
+            return True
+        
+        library = MacroProcessor()
+        library.first_pass(source_code)
+        os.makedirs(cache_dir, exist_ok=True)
+        library.save_library(path)
+        self.load_library(path)
+        return False
+
     def first_pass(self, source_code):
         """First pass: Process macro definitions and build tables"""
         lines = source_code.split('\n')
         i = 0
-        mdt_index = 0
-
+        
         while i < len(lines):
             line = lines[i].strip()
             
             if line.startswith('MACRO'):
-                # Extract macro name and parameters
-                parts = line.split()
-                macro_name = parts[1]
-                if len(parts) > 2:
-                    # Get parameters and remove trailing commas
-                    formal_params = [p.rstrip(',') for p in parts[2:]]
-                else:
-                    formal_params = ['-']
-                
-                # Add to Macro Name Table
-                self.macro_name_table[macro_name] = mdt_index
-                
-                # Initialize ALA for this macro
-                self.ala[macro_name] = {
-                    'formal': formal_params,
-                    'actual': []
-                }
-                
-                # Add macro definition to MDT
-                macro_def = {
-                    'name': macro_name,
-                    'params': formal_params,
-                    'body': []
-                }
-                
                 # Collect macro body until MEND
+                body = []
                 i += 1
                 while i < len(lines) and not lines[i].strip().startswith('MEND'):
-                    macro_def['body'].append(lines[i])
+                    body.append(lines[i])
                     i += 1
-                
-                self.macro_def_table.append(macro_def)
-                mdt_index += 1
+                self.define_macro(line, body)
             
             i += 1
 
     def expand_macro(self, macro_name, actual_params):
-        """Expand a macro call using MDT and ALA"""
-        # Get macro definition from MDT using MNT
-        mdt_index = self.macro_name_table[macro_name]
-        macro_def = self.macro_def_table[mdt_index]
+        """Expand a macro call using MNT, MDT and a per-call ALA"""
+        start, end, formal_params = self.macro_name_table[macro_name]
         
-        # Update ALA with actual parameters
-        self.ala[macro_name]['actual'] = actual_params
+        # ALA: actuals by position; formals without an actual are left as written
+        ala = tuple(actual_params[:len(formal_params)]) + formal_params[len(actual_params):]
         
-        # Create parameter mapping using ALA
-        param_map = dict(zip(
-            self.ala[macro_name]['formal'],
-            self.ala[macro_name]['actual']
-        ))
-        
-        # Expand macro body with arguments
-        expanded_code = []
-        for line in macro_def['body']:
-            expanded_line = line
-            for formal, actual in param_map.items():
-                expanded_line = expanded_line.replace(formal, actual)
-            expanded_code.append(expanded_line)
+        # Expand macro body: one format call per precompiled line
+        return [template.format(*ala) for template in self.macro_def_table[start:end]]
+
+    def parse_call(self, line):
+        """Return (macro_name, actual_params) if line calls a macro, else None"""
+        parts = line.split()
+        if parts and parts[0] in self.macro_name_table:
+            return parts[0], [p.rstrip(',') for p in parts[1:]]
+        return None
+
+    def expand_nested(self, macro_name, actual_params):
+        """Expand a macro call and every macro call inside its expansion
+
+        Uses an explicit stack of (macro name, remaining lines, output
+        start) frames instead of recursion. Raises ValueError on a
+        recursive call or when nesting exceeds max_depth.
+        """
+        cached = self.expansion_cache.get(macro_name)
+        if cached is not None:
+            return list(cached)
         
-        return expanded_code
+        output = []
+        stack = [(macro_name, iter(self.expand_macro(macro_name, actual_params)), 0)]
+        active = {macro_name}
+        while stack:
+            name, lines, start = stack[-1]
+            line = next(lines, None)
+            if line is None:
+                stack.pop()
+                active.discard(name)
+                if self.macro_name_table[name][2] == ('-',):
+                    # Parameterless: the expansion never changes
+                    self.expansion_cache[name] = output[start:]
+                continue
+            
+            call = self.parse_call(line)
+            if call is None:
+                output.append(line)
+                continue
+            
+            inner_name, inner_params = call
+            if inner_name in active:
+                chain = " -> ".join(frame[0] for frame in stack)
+                raise ValueError(f"Recursive macro call: {chain} -> {inner_name}")
+            cached = self.expansion_cache.get(inner_name)
+            if cached is not None:
+                output.extend(cached)
+                continue
+            if len(stack) >= self.max_depth:
+                raise ValueError(f"Macro nesting deeper than {self.max_depth} at {inner_name}")
+            stack.append((inner_name,
+                          iter(self.expand_macro(inner_name, inner_params)),
+                          len(output)))
+            active.add(inner_name)
+        return output
 
     def second_pass(self, source_code):
         """Second pass: Expand macro calls using tables"""
@@ -90,19 +218,18 @@ class MacroProcessor:
         while i < len(lines):
             line = lines[i].strip()
             
-            # Skip macro definitions and MEND
-            if line.startswith('MACRO') or line.startswith('MEND'):
+            # Skip macro definitions up to and including MEND
+            if line.startswith('MACRO'):
+                while i < len(lines) and not lines[i].strip().startswith('MEND'):
+                    i += 1
                 i += 1
                 continue
             
             # Check for macro call
-            parts = line.split()
-            if parts and parts[0] in self.macro_name_table:
-                macro_name = parts[0]
-                actual_params = [p.rstrip(',') for p in parts[1:]]
-                
-                # Expand macro call using tables
-                expanded_code = self.expand_macro(macro_name, actual_params)
+            call = self.parse_call(line)
+            if call is not None:
+                # Expand macro call (and any calls nested in it) using tables
+                expanded_code = self.expand_nested(*call)
                 self.intermediate_code.extend(expanded_code)
             else:
                 self.intermediate_code.append(line)
@@ -115,50 +242,114 @@ class MacroProcessor:
         self.second_pass(source_code)
         return '\n'.join(self.intermediate_code)
 
+    def stream(self, lines):
+        """Single pass: define macros and expand calls as lines arrive
+
+        Macros must be defined before they are used; a call to a macro
+        not yet defined is passed through unchanged. Only the MDT and
+        one call's expansion are held in memory.
+
+        Args:
+            lines: iterable of source lines, e.g. an open file
+
+        Yields:
+            str: expanded lines, without line endings
+        """
+        header = None
+        body = []
+        for line in lines:
+            line = line.rstrip('\n')
+            stripped = line.strip()
+            
+            # Inside a definition: collect the body until MEND
+            if header is not None:
+                if stripped.startswith('MEND'):
+                    self.define_macro(header, body)
+                    header = None
+                    body = []
+                else:
+                    body.append(line)
+                continue
+            
+            if stripped.startswith('MACRO'):
+                header = stripped
+                continue
+            
+            call = self.parse_call(stripped)
+            if call is not None:
+                yield from self.expand_nested(*call)
+            else:
+                yield stripped
+
     def print_tables(self):
         # Print Macro Name Table (MNT)
         print("\nMacro Name Table (MNT)")
-        print("Name".ljust(15) + "MDT Index".ljust(10))
-        for name, index in self.macro_name_table.items():
-            print(f"{name.ljust(15)}{str(index).ljust(10)}")
+        print("Name".ljust(15) + "MDT Start".ljust(10) + "MDT End".ljust(10))
+        for name, (start, end, _) in self.macro_name_table.items():
+            print(f"{name.ljust(15)}{str(start).ljust(10)}{str(end).ljust(10)}")
 
 
-        # Print Macro Definition Table (MDT)
+        # Print Macro Definition Table (MDT), with slots shown as their formals
         print("\nMacro Definition Table (MDT)")
-        print("MDT Index".ljust(10) + "Parameters".ljust(20) + "Macro Body")
-        for i, macro in enumerate(self.macro_def_table):
-            params_str = ", ".join(macro['params'])
-            indent = " "*30
-            body_lines = [line.strip() for line in macro['body']]
-            body_str = "\n" + indent + ("\n" + indent).join(body_lines)
-            
-            print(f"{str(i).ljust(10)}{params_str.ljust(20)}{body_str}")
+        print("MDT Index".ljust(10) + "Macro Body")
+        for start, end, formal_params in self.macro_name_table.values():
+            for i in range(start, end):
+                line = self.macro_def_table[i].format(*formal_params).strip()
+                print(f"{str(i).ljust(10)}{line}")
 
-        # Print Argument List Array (ALA)
+        # Print Argument List Array (ALA) slot assignments
         print("\nArgument List Array (ALA)")
-        print("Macro Name".ljust(15) + "Formal Parameters".ljust(25) + "Actual Parameters")
-        for macro_name, params in self.ala.items():
-            formal_str = ", ".join(params['formal'])
-            actual_str = ", ".join(params['actual'])
-            print(f"{macro_name.ljust(15)}{formal_str.ljust(25)}{actual_str}")
+        print("Macro Name".ljust(15) + "Formal Parameters (by slot)")
+        for macro_name, (_, _, formal_params) in self.macro_name_table.items():
+            slots_str = ", ".join(f"{{{i}}}={name}" for i, name in enumerate(formal_params))
+            print(f"{macro_name.ljust(15)}{slots_str}")
 
 
 def main():
-    import sys
+    args = sys.argv[1:]
+    single_pass = "--single-pass" in args
+    if single_pass:
+        args.remove("--single-pass")
+    options = {}
+    for flag in ("--library", "--cache"):
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
     
-    if len(sys.argv) != 3:
-        print("Usage: python macro.py <input_file> <output_file>")
+    if len(args) != 2 or ("--cache" in options and "--library" not in options):
+        print("Usage: python macro.py [--single-pass] [--library lib.asm [--cache DIR]] "
+              "<input_file> <output_file>")
         sys.exit(1)
         
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
+    input_file = args[0]
+    output_file = args[1]
+    
+    # Macros from a shared library are defined before the input is read
+    processor = MacroProcessor()
+    if "--library" in options:
+        with open(options["--library"], 'r') as file:
+            library_code = file.read()
+        if "--cache" in options:
+            cached = processor.load_cached_library(library_code, options["--cache"])
+            print(f"Macro library {'loaded from' if cached else 'saved to'} "
+                  f"cache '{options['--cache']}'")
+        else:
+            processor.first_pass(library_code)
+    
+    if single_pass:
+        # Stream expanded lines straight from the input to the output file
+        with open(input_file, 'r') as infile, open(output_file, 'w') as outfile:
+            for line in processor.stream(infile):
+                outfile.write(line + '\n')
+        print(f"Intermediate code has been written to '{output_file}'")
+        return
     
     # Read source code from input file
     with open(input_file, 'r') as file:
         source_code = file.read()
 
     # Process the source code
-    processor = MacroProcessor()
     intermediate_code = processor.process(source_code)
     
     # Print tables for verification
@@ -0,0 +1,16 @@
+MACRO A
+    B
+MEND
+MACRO C
+    A
+MEND
+C
+MACRO B
+    LOAD X
+MEND
+MACRO A
+    B
+    LOAD NEW
+MEND
+C
+END
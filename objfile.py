@@ -0,0 +1,131 @@
+import mmap
+import struct
+import sys
+
+# Object file layout (all little-endian):
+#   header    HEADER
+#   code      n_words fixed-width WORDs, word i is memory address origin + i
+#   symbols   n_symbols SYMBOLs, names stored in the names section
+#   literals  n_literals LITERALs
+#   names     UTF-8 symbol names, referenced by (offset, length)
+MAGIC = b'ASMO'
+VERSION = 1
+HEADER = struct.Struct('<4sHHiIIII')  # magic, version, reserved, origin,
+                                      # n_words, n_symbols, n_literals, names_size
+WORD = struct.Struct('<BBxxi')        # opcode, reg, address/constant
+SYMBOL = struct.Struct('<IIiiI')      # name offset, name length, addr, val, len
+LITERAL = struct.Struct('<ii')        # address, value
+
+
+def write_object(path, origin, length, machine_code, symbol_table, literal_table):
+    """Write assembled code and tables as a binary object file
+
+    Args:
+        origin (int): address of the first word (the START address)
+        length (int): number of words in the memory image
+        machine_code: (lc, opcode, reg, address) words from pass II;
+            addresses without a word (DS areas) are zero-filled
+        symbol_table, literal_table: the assembler's SYMTAB and LITTAB
+    """
+    code = bytearray(length * WORD.size)
+    for lc, opcode, reg, addr in machine_code:
+        WORD.pack_into(code, (lc - origin) * WORD.size, opcode, reg, addr)
+
+    names = bytearray()
+    symbols = bytearray()
+    for entry in symbol_table:
+        name = entry['symb'].encode()
+        symbols += SYMBOL.pack(len(names), len(name), entry['addr'],
+                               entry['val'], entry['len'])
+        names += name
+
+    literals = bytearray()
+    for entry in literal_table:
+        value = int(entry['value'].lstrip('=').strip("'\""))
+        literals += LITERAL.pack(entry['address'], value)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, origin, length,
+                            len(symbol_table), len(literal_table), len(names)))
+        f.write(code)
+        f.write(symbols)
+        f.write(literals)
+        f.write(names)
+
+
+class ObjectFile:
+    """Read-only view of an object file mapped into memory
+
+    Nothing is parsed up front: sections are memoryview slices of the
+    mapping and entries are unpacked only when accessed.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.origin, self.n_words, self.n_symbols, \
+            self.n_literals, names_size = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.mm.close()
+            raise ValueError(f"{path}: not a version {VERSION} object file")
+
+        self.view = view = memoryview(self.mm)
+        offset = HEADER.size
+        self.code = view[offset:offset + self.n_words * WORD.size]
+        offset += len(self.code)
+        self.symbols = view[offset:offset + self.n_symbols * SYMBOL.size]
+        offset += len(self.symbols)
+        self.literals = view[offset:offset + self.n_literals * LITERAL.size]
+        offset += len(self.literals)
+        self.names = view[offset:offset + names_size]
+
+    def word(self, addr):
+        """Return (opcode, reg, address) stored at a memory address"""
+        return WORD.unpack_from(self.code, (addr - self.origin) * WORD.size)
+
+    def iter_words(self):
+        """Yield (opcode, reg, address) for every word in the image"""
+        return WORD.iter_unpack(self.code)
+
+    def iter_symbols(self):
+        """Yield (name, addr, val, len) for every SYMTAB entry"""
+        for offset, length, addr, val, size in SYMBOL.iter_unpack(self.symbols):
+            yield str(self.names[offset:offset + length], 'utf-8'), addr, val, size
+
+    def iter_literals(self):
+        """Yield (address, value) for every LITTAB entry"""
+        return LITERAL.iter_unpack(self.literals)
+
+    def close(self):
+        for view in (self.code, self.symbols, self.literals, self.names, self.view):
+            view.release()
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python objfile.py <object_file>")
+        sys.exit(1)
+
+    with ObjectFile(sys.argv[1]) as obj:
+        print(f"Origin: {obj.origin}\tWords: {obj.n_words}")
+        print("\nCode:")
+        for i, (opcode, reg, addr) in enumerate(obj.iter_words()):
+            print(f"{obj.origin + i:03d}) + {opcode:02d} {reg} {addr:03d}")
+        print("\nSymbols:")
+        print("Symbol\tAddress\tValue\tLength")
+        for name, addr, val, size in obj.iter_symbols():
+            print(f"{name}\t{addr}\t{val}\t{size}")
+        print("\nLiterals:")
+        print("Address\tValue")
+        for addr, value in obj.iter_literals():
+            print(f"{addr}\t{value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import sys
+import time
+from array import array
+
+import objfile
+from assembler import Assembler
+
+# BC condition code (EQ=1 .. NE=6) -> results of COMP for which it branches,
+# where COMP stores -1, 0 or 1 for reg <, ==, > memory
+CONDITIONS = {
+    1: (0,),        # EQ
+    2: (-1,),       # LT
+    3: (1,),        # GT
+    4: (-1, 0),     # LE
+    5: (0, 1),      # GE
+    6: (-1, 1),     # NE
+}
+
+
+def encode_word(opcode, reg, addr):
+    """Value of a word in memory: constants as-is, instructions as +op reg addr"""
+    if opcode == 0 and reg == 0:
+        return addr
+    return opcode * 10000 + reg * 1000 + addr
+
+
+class Simulator:
+    """Executes machine code for the optab instruction set
+
+    Memory is an array of ints indexed by address. Before running, every
+    word of the program is decoded once into a (handler, reg, addr)
+    tuple, so the run loop does one list index and one call per step.
+    """
+
+    def __init__(self, words, origin, length, inputs=(), echo=False):
+        """words: (address, opcode, reg, address) for each non-empty word"""
+        self.origin = origin
+        self.length = length
+        self.memory = array('q', bytes(8 * (origin + length)))
+        self.decoded = [(0, 0, 0)] * length   # (opcode, reg, addr) per address
+        for lc, opcode, reg, addr in words:
+            self.memory[lc] = encode_word(opcode, reg, addr)
+            self.decoded[lc - origin] = (opcode, reg, addr)
+
+        self.registers = [0, 0, 0, 0]   # AREG, BREG, CREG, DREG
+        self.cc = 0                     # Result of the last COMP
+        self.inputs = iter(inputs)
+        self.output = []
+        self.echo = echo
+        self.steps = 0
+
+        # Basic blocks decoded by run_blocks(), keyed by start address
+        self.block_cache = {}
+
+    @classmethod
+    def from_assembler(cls, assembler, **kwargs):
+        if not assembler.machine_code:
+            assembler.pass_two()
+        return cls(assembler.machine_code, assembler.origin,
+                   assembler.end - assembler.origin, **kwargs)
+
+    @classmethod
+    def from_object(cls, path, **kwargs):
+        with objfile.ObjectFile(path) as obj:
+            words = [(obj.origin + i, opcode, reg, addr)
+                     for i, (opcode, reg, addr) in enumerate(obj.iter_words())]
+            return cls(words, obj.origin, obj.n_words, **kwargs)
+
+    #------------------Instruction handlers----------------------
+    # Each takes (reg index, operand, pc) and returns the next pc,
+    # or -1 to halt.
+
+    def op_stop(self, r, a, pc):
+        return -1
+
+    def op_add(self, r, a, pc):
+        self.registers[r] += self.memory[a]
+        return pc + 1
+
+    def op_sub(self, r, a, pc):
+        self.registers[r] -= self.memory[a]
+        return pc + 1
+
+    def op_mult(self, r, a, pc):
+        self.registers[r] *= self.memory[a]
+        return pc + 1
+
+    def op_mover(self, r, a, pc):
+        self.registers[r] = self.memory[a]
+        return pc + 1
+
+    def op_movem(self, r, a, pc):
+        self.memory[a] = self.registers[r]
+        return pc + 1
+
+    def op_comp(self, r, a, pc):
+        reg = self.registers[r]
+        mem = self.memory[a]
+        self.cc = (reg > mem) - (reg < mem)
+        return pc + 1
+
+    def op_bc(self, cond, a, pc):
+        if self.cc in cond:
+            return a
+        return pc + 1
+
+    def op_div(self, r, a, pc):
+        divisor = self.memory[a]
+        if divisor == 0:
+            raise ZeroDivisionError(f"DIV by zero at {pc}")
+        self.registers[r] = int(self.registers[r] / divisor)  # Truncate toward 0
+        return pc + 1
+
+    def op_read(self, r, a, pc):
+        try:
+            self.memory[a] = int(next(self.inputs))
+        except StopIteration:
+            raise RuntimeError(f"READ at {pc}: no more input") from None
+        return pc + 1
+
+    def op_print(self, r, a, pc):
+        value = self.memory[a]
+        self.output.append(value)
+        if self.echo:
+            print(value)
+        return pc + 1
+
+    def predecode(self):
+        """Decode every word once into (handler, reg index/cond, addr)"""
+        dispatch = [self.op_stop, self.op_add, self.op_sub, self.op_mult,
+                    self.op_mover, self.op_movem, self.op_comp, self.op_bc,
+                    self.op_div, self.op_read, self.op_print]
+        program = []
+        for opcode, reg, addr in self.decoded:
+            if opcode == 7:
+                arg = CONDITIONS.get(reg, ())
+            else:
+                arg = reg - 1
+            handler = dispatch[opcode] if opcode < len(dispatch) else self.op_stop
+            program.append((handler, arg, addr))
+        return program
+
+    def run(self, entry=None, max_steps=None):
+        """Run from entry (default: origin) until STOP
+
+        Returns:
+            list: values printed by PRINT
+        """
+        pc = self.origin if entry is None else entry
+        origin = self.origin
+        program = self.predecode()
+        limit = len(program)
+        steps = 0
+        max_steps = max_steps or -1
+        while pc >= 0:
+            i = pc - origin
+            if not 0 <= i < limit:
+                raise RuntimeError(f"Jump outside the program to {pc}")
+            if steps == max_steps:
+                raise RuntimeError(f"Stopped after {steps} steps at {pc}")
+            handler, arg, addr = program[i]
+            pc = handler(arg, addr, pc)
+            steps += 1
+        self.steps += steps
+        return self.output
+
+    #------------------Basic blocks----------------------
+
+    def leaders(self):
+        """Addresses that start a basic block: BC targets and successors"""
+        leaders = set()
+        for i, (opcode, reg, addr) in enumerate(self.decoded):
+            if opcode == 7:
+                leaders.add(addr)
+                leaders.add(self.origin + i + 1)
+        return leaders
+
+    def compile_op(self, opcode, reg, addr, pc):
+        """Bind a straight-line instruction to a no-argument closure"""
+        regs = self.registers
+        mem = self.memory
+        r = reg - 1
+        if opcode == 1:
+            def op():
+                regs[r] += mem[addr]
+        elif opcode == 2:
+            def op():
+                regs[r] -= mem[addr]
+        elif opcode == 3:
+            def op():
+                regs[r] *= mem[addr]
+        elif opcode == 4:
+            def op():
+                regs[r] = mem[addr]
+        elif opcode == 5:
+            def op():
+                mem[addr] = regs[r]
+        elif opcode == 6:
+            def op():
+                reg = regs[r]
+                value = mem[addr]
+                self.cc = (reg > value) - (reg < value)
+        else:
+            # DIV, READ and PRINT are rare enough to reuse the step handlers
+            handler = [None, None, None, None, None, None, None, None,
+                       self.op_div, self.op_read, self.op_print][opcode]
+
+            def op():
+                handler(r, addr, pc)
+        return op
+
+    def build_block(self, start, leaders):
+        """Decode the basic block at start into (ops, count, exit)
+
+        exit is ('stop',), ('next', addr) or ('bc', cond, target, next).
+        """
+        ops = []
+        pc = start
+        limit = self.origin + self.length
+        while True:
+            if not self.origin <= pc < limit:
+                raise RuntimeError(f"Jump outside the program to {pc}")
+            opcode, reg, addr = self.decoded[pc - self.origin]
+            if opcode == 0 or opcode > 10:
+                exit = ('stop',)
+                break
+            if opcode == 7:
+                exit = ('bc', CONDITIONS.get(reg, ()), addr, pc + 1)
+                break
+            ops.append(self.compile_op(opcode, reg, addr, pc))
+            pc += 1
+            if pc in leaders:
+                exit = ('next', pc)
+                break
+        block = (tuple(ops), len(ops) + 1, exit)
+        self.block_cache[start] = block
+        return block
+
+    def run_blocks(self, entry=None, max_steps=None):
+        """Like run(), but executes whole pre-decoded basic blocks
+
+        Each block is decoded once, on first entry, into a tuple of bound
+        closures and cached, so loops skip per-instruction decoding and
+        dispatch. max_steps is checked once per block.
+
+        Returns:
+            list: values printed by PRINT
+        """
+        pc = self.origin if entry is None else entry
+        cache = self.block_cache
+        leaders = self.leaders()
+        steps = 0
+        while True:
+            block = cache.get(pc)
+            if block is None:
+                block = self.build_block(pc, leaders)
+            ops, count, exit = block
+            for op in ops:
+                op()
+            steps += count
+            kind = exit[0]
+            if kind == 'bc':
+                pc = exit[2] if self.cc in exit[1] else exit[3]
+            elif kind == 'next':
+                pc = exit[1]
+                steps -= 1      # Fall-through is not an instruction
+            else:
+                break
+            if max_steps is not None and steps >= max_steps:
+                raise RuntimeError(f"Stopped after {steps} steps at {pc}")
+        self.steps += steps
+        return self.output
+
+    def display_state(self):
+        print("\nRegisters:")
+        for name, value in zip(["AREG", "BREG", "CREG", "DREG"], self.registers):
+            print(f"{name}\t{value}")
+
+
+def main():
+    args = sys.argv[1:]
+    blocks = "--blocks" in args
+    if blocks:
+        args.remove("--blocks")
+
+    if not args:
+        print("Usage: python simulator.py [--blocks] <source_file|object_file> [input]...")
+        sys.exit(1)
+
+    filename = args[0]
+    inputs = args[1:]
+    if filename.endswith(".o"):
+        sim = Simulator.from_object(filename, inputs=inputs, echo=True)
+    else:
+        assembler = Assembler()
+        with open(filename, 'r') as sf:
+            assembler.assemble(sf)
+        sim = Simulator.from_assembler(assembler, inputs=inputs, echo=True)
+
+    start = time.perf_counter()
+    if blocks:
+        sim.run_blocks()
+    else:
+        sim.run()
+    elapsed = time.perf_counter() - start
+    sim.display_state()
+    rate = sim.steps / elapsed if elapsed else 0.0
+    print(f"\n{sim.steps} instructions in {elapsed:.4f}s ({rate:.0f} instructions/sec)")
+
+if __name__ == "__main__":
+    main()